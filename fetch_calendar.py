@@ -6,13 +6,33 @@ Fetches and parses MyCourses calendar export data.
 This is a proof-of-concept to validate calendar data access.
 """
 
+import heapq
+import json
+import os
+import re
 import sys
+from dataclasses import dataclass
+from operator import attrgetter
 from pathlib import Path
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 import requests
-from ics import Calendar
+from requests.adapters import HTTPAdapter, Retry
+
+# One session for the whole run: repeated fetches against mycourses.aalto.fi
+# reuse the same TLS connection instead of paying TCP+TLS setup every call.
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": "myco-planner/0.1"})
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+    ),
+)
 
 
 def load_calendar_url() -> Optional[str]:
@@ -46,27 +66,100 @@ def load_calendar_url() -> Optional[str]:
         return None
 
 
+# Explanations for HTTP errors the feed is known to produce
+_STATUS_MESSAGES: dict[int, str] = {
+    401: (
+        "❌ Error: Unauthorized (401)\n"
+        "Your auth token may have expired. Get a new export URL from MyCourses"
+    ),
+    404: (
+        "❌ Error: URL not found (404)\n"
+        "Please check that your calendar export URL is correct"
+    ),
+}
+
+# On-disk cache: the ICS body plus a sidecar with the validator headers,
+# so unchanged feeds cost a single conditional GET instead of a full download.
+CACHE_FILE = Path("cached_calendar.ics")
+CACHE_META_FILE = Path(".cache.json")
+
+
+def _load_cache_meta() -> dict:
+    """Load cached validator headers (etag / last_modified), if any."""
+    if not (CACHE_META_FILE.exists() and CACHE_FILE.exists()):
+        return {}
+    try:
+        return json.loads(CACHE_META_FILE.read_text())
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_cache(response: requests.Response) -> str:
+    """Consume the response body, cache it, and return the ICS text.
+
+    The body is read in 64 KiB chunks so requests never has to buffer the
+    download as one blob, and the stream is fully consumed before any
+    file I/O so a cache failure can never leave it half-drained. Caching
+    is best-effort: if the cache cannot be written, the text is still
+    returned and the next run simply does a full fetch again.
+    """
+    chunks: list[bytes] = []
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        chunks.append(chunk)
+    text = b"".join(chunks).decode(response.encoding or "utf-8", errors="replace")
+
+    try:
+        tmp = CACHE_FILE.with_suffix(".ics.tmp")
+        tmp.write_text(text, encoding="utf-8", newline="")
+        os.replace(tmp, CACHE_FILE)
+        meta = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        tmp_meta = CACHE_META_FILE.with_suffix(".json.tmp")
+        tmp_meta.write_text(json.dumps(meta, indent=2))
+        os.replace(tmp_meta, CACHE_META_FILE)
+    except OSError as e:
+        # Caching is best-effort; the download itself still succeeded
+        print(f"⚠️  Could not update calendar cache: {e}")
+    return text
+
+
 def fetch_calendar_data(url: str) -> Optional[str]:
-    """Fetch ICS data from the calendar URL."""
+    """Fetch ICS data from the calendar URL, using the on-disk cache when fresh."""
     print("📡 Fetching calendar from MyCourses...")
-    
+
+    meta = _load_cache_meta()
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
     try:
-        response = requests.get(url, timeout=10)
+        response = SESSION.get(url, headers=headers, stream=True, timeout=10)
+
+        if response.status_code == 304:
+            try:
+                with CACHE_FILE.open(encoding="utf-8", newline="") as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                # Cache vanished or corrupted since the meta check;
+                # retry without validators to force a full download
+                print(f"⚠️  Cached copy unreadable ({e}), fetching in full...")
+                response = SESSION.get(url, stream=True, timeout=10)
+            else:
+                print("📦 Calendar unchanged, using cached copy")
+                return text
+
         response.raise_for_status()
-        return response.text
+        return _save_cache(response)
     except requests.exceptions.Timeout:
         print("❌ Error: Request timed out")
         print("Please check your internet connection and try again")
         return None
     except requests.exceptions.HTTPError as e:
-        if response.status_code == 401:
-            print("❌ Error: Unauthorized (401)")
-            print("Your auth token may have expired. Get a new export URL from MyCourses")
-        elif response.status_code == 404:
-            print("❌ Error: URL not found (404)")
-            print("Please check that your calendar export URL is correct")
-        else:
-            print(f"❌ HTTP Error: {e}")
+        print(_STATUS_MESSAGES.get(response.status_code, f"❌ HTTP Error: {e}"))
         return None
     except requests.exceptions.RequestException as e:
         print(f"❌ Network error: {e}")
@@ -74,11 +167,122 @@ def fetch_calendar_data(url: str) -> Optional[str]:
         return None
 
 
-def parse_calendar_events(ics_data: str) -> Optional[Calendar]:
-    """Parse ICS data into calendar events."""
+@dataclass(slots=True)
+class CalendarEvent:
+    """The subset of VEVENT fields the planner actually uses."""
+
+    begin: Optional[datetime] = None
+    end: Optional[datetime] = None
+    name: str = ""
+    location: str = ""
+    description: str = ""
+
+
+def _unfold_lines(ics_data: str) -> Iterator[str]:
+    """Yield logical ICS lines, joining folded continuation lines."""
+    current = None
+    for raw in ics_data.splitlines():
+        if raw[:1] in (" ", "\t"):
+            if current is not None:
+                current += raw[1:]
+            continue
+        if current is not None:
+            yield current
+        current = raw
+    if current is not None:
+        yield current
+
+
+def _unescape(value: str) -> str:
+    """Undo ICS text escaping (\\n, \\, \\; \\\\)."""
+    return re.sub(
+        r"\\([\\;,nN])",
+        lambda m: "\n" if m.group(1) in "nN" else m.group(1),
+        value,
+    )
+
+
+def _parse_ics_datetime(value: str, tzid: Optional[str] = None) -> Optional[datetime]:
+    """Parse a DTSTART/DTEND value (UTC, TZID-zoned, floating, or date-only).
+
+    Always returns an aware datetime so events compare cleanly against
+    datetime.now(timezone.utc) in display_events.
+    """
+    try:
+        if value.endswith("Z"):
+            return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(
+                tzinfo=timezone.utc
+            )
+        if "T" in value:
+            parsed = datetime.strptime(value, "%Y%m%dT%H%M%S")
+        else:
+            parsed = datetime.strptime(value, "%Y%m%d")
+    except ValueError:
+        return None
+    if tzid:
+        try:
+            return parsed.replace(tzinfo=ZoneInfo(tzid))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    # Floating and date-only values: interpret in the machine's local zone
+    return parsed.astimezone()
+
+
+_WANTED_KEYS = {"DTSTART", "DTEND", "SUMMARY", "LOCATION", "DESCRIPTION"}
+
+
+def parse_calendar_events(ics_data: str) -> Optional[list[CalendarEvent]]:
+    """Parse ICS data into calendar events.
+
+    A single line scan that extracts only the fields display_events reads;
+    much faster and lighter than building the full ics-library object graph
+    (Arrow datetimes, property containers) for a semester-sized feed.
+    """
     try:
-        calendar = Calendar(ics_data)
-        return calendar
+        events: list[CalendarEvent] = []
+        current: Optional[CalendarEvent] = None
+        depth = 0  # components nested inside the current VEVENT (e.g. VALARM)
+        for line in _unfold_lines(ics_data):
+            if line == "BEGIN:VEVENT":
+                current = CalendarEvent()
+                depth = 0
+                continue
+            if line == "END:VEVENT":
+                if current is not None:
+                    events.append(current)
+                current = None
+                continue
+            if current is not None and line.startswith("BEGIN:"):
+                depth += 1
+                continue
+            if current is not None and line.startswith("END:"):
+                if depth:
+                    depth -= 1
+                continue
+            if current is None or depth or ":" not in line:
+                continue
+            prop, value = line.split(":", 1)
+            params = prop.split(";")
+            key = params[0].upper()
+            if key not in _WANTED_KEYS:
+                continue
+            if key in ("DTSTART", "DTEND"):
+                tzid = None
+                for param in params[1:]:
+                    if param.upper().startswith("TZID="):
+                        tzid = param[5:]
+                        break
+                if key == "DTSTART":
+                    current.begin = _parse_ics_datetime(value, tzid)
+                else:
+                    current.end = _parse_ics_datetime(value, tzid)
+            elif key == "SUMMARY":
+                current.name = _unescape(value)
+            elif key == "LOCATION":
+                current.location = _unescape(value)
+            else:
+                current.description = _unescape(value)
+        return events
     except Exception as e:
         print(f"❌ Error parsing calendar data: {e}")
         print("\nSaving raw ICS data to 'debug_calendar.ics' for inspection...")
@@ -90,59 +294,67 @@ def parse_calendar_events(ics_data: str) -> Optional[Calendar]:
         return None
 
 
-def format_datetime(dt: Optional[datetime]) -> str:
+# Display format: Mon Nov 18, 2024 09:00
+_DATETIME_FMT = "%a %b %d, %Y %H:%M"
+
+
+def format_datetime(dt: datetime) -> str:
     """Format a datetime object for display."""
-    if dt is None:
-        return "No date"
-    
-    # Format: Mon Nov 18, 2024 09:00
-    return dt.strftime("%a %b %d, %Y %H:%M")
+    return dt.strftime(_DATETIME_FMT)
 
 
-def display_events(calendar: Calendar):
-    """Display calendar events in a readable format."""
-    events = list(calendar.events)
-    
+# How many upcoming events to show
+MAX_EVENTS_SHOWN = 20
+
+
+def display_events(events: list[CalendarEvent]):
+    """Display the next upcoming calendar events in a readable format."""
     if not events:
         print("\n📭 No events found in the calendar")
         return
     
-    print(f"\n✅ Found {len(events)} event(s)")
-    
-    # Sort events by start time
-    sorted_events = sorted(events, key=lambda e: e.begin if e.begin else datetime.min)
-    
-    # Filter to only upcoming/recent events (you can adjust this)
-    now = datetime.now()
-    
-    print("\n" + "=" * 60)
-    print("📅 CALENDAR EVENTS")
-    print("=" * 60)
-    
-    for event in sorted_events:
-        print(f"\n🗓️  {format_datetime(event.begin)}")
-        
+    # Only upcoming events matter for planning, and only the next few are
+    # shown, so pick those with a heap instead of sorting the whole semester.
+    now = datetime.now(timezone.utc)
+    upcoming = [e for e in events if e.begin and e.begin >= now]
+
+    print(f"\n✅ Found {len(events)} event(s), {len(upcoming)} upcoming")
+
+    if not upcoming:
+        print("\n📭 No upcoming events in the calendar")
+        return
+
+    next_events = heapq.nsmallest(MAX_EVENTS_SHOWN, upcoming, key=attrgetter("begin"))
+
+    # Buffer the listing and write it in one go: one stdout lock/flush
+    # instead of roughly six per event
+    out = ["", "=" * 60, f"📅 NEXT {len(next_events)} EVENT(S)", "=" * 60]
+
+    for event in next_events:
+        out.append(f"\n🗓️  {format_datetime(event.begin)}")
+
         # Event name/summary
         if event.name:
-            print(f"   {event.name}")
-        
+            out.append(f"   {event.name}")
+
         # End time if different from start
         if event.end and event.end != event.begin:
-            print(f"   Ends: {format_datetime(event.end)}")
-        
+            out.append(f"   Ends: {format_datetime(event.end)}")
+
         # Location
         if event.location:
-            print(f"   📍 Location: {event.location}")
-        
+            out.append(f"   📍 Location: {event.location}")
+
         # Description preview (first 100 chars)
         if event.description:
             desc = event.description.strip()
             if len(desc) > 100:
                 desc = desc[:97] + "..."
             if desc:
-                print(f"   📝 {desc}")
-    
-    print("\n" + "=" * 60)
+                out.append(f"   📝 {desc}")
+
+    out.append("\n" + "=" * 60)
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def main():
@@ -161,12 +373,12 @@ def main():
         sys.exit(1)
     
     # Step 3: Parse events
-    calendar = parse_calendar_events(ics_data)
-    if not calendar:
+    events = parse_calendar_events(ics_data)
+    if events is None:
         sys.exit(1)
-    
+
     # Step 4: Display events
-    display_events(calendar)
+    display_events(events)
     
     print("\n✨ Spike complete!")
 